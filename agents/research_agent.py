@@ -4,11 +4,16 @@
 
 #from ibm_watsonx_ai.foundation_models import ModelInference
 #from ibm_watsonx_ai import Credentials, APIClient
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from langchain.schema import Document
 from config.settings import settings
+from pathlib import Path
+import asyncio
+import hashlib
+import io
 import json
 import ollama
+from openai import AsyncOpenAI, OpenAI
 
 #credentials = Credentials(
 #                   url = "https://us-south.ml.cloud.ibm.com",
@@ -33,8 +38,27 @@ class ResearchAgent:
         #     }
         # )
 
-        #Set Ollama model to be used to generate response
-        self.model = "llama3.2-vision:11b"
+        #Set Ollama model to be used to generate response.
+        #Defaults to the 4-bit K-quant (Q4_K_M) build: decode is memory-bandwidth bound, so smaller weights decode faster.
+        #When LLM_BACKEND is "vllm", requests go to a vLLM server instead (continuous batching + chunked prefill).
+        self.backend = settings.LLM_BACKEND
+        self.model = settings.VLLM_MODEL if self.backend == "vllm" else settings.OLLAMA_MODEL
+        self.temperature = settings.RESEARCH_TEMPERATURE
+
+        #Ollama runtime options: offload all layers to the GPU, allow long RAG prompts and prefill in 512-token batches
+        self.options = {
+            "temperature": self.temperature,
+            "num_gpu": 99,
+            "num_ctx": 8192,
+            "num_batch": 512
+        }
+
+        #On-disk cache of previous answers, stored alongside the document chunk cache
+        self.cache_dir = Path(settings.CACHE_DIR)
+        self._response_cache_path = self.cache_dir / "llm_cache"
+        self._response_cache_path.mkdir(parents=True, exist_ok=True)
+        if self.temperature != 0:
+            print(f"Response cache disabled: RESEARCH_TEMPERATURE is {self.temperature}, answers are only cached at temperature 0.")
 
         print("ModelInference initialized successfully.")
 
@@ -51,81 +75,273 @@ class ResearchAgent:
         """
         Generate a structured prompt for the LLM to generate a precise and factual answer.
         """
+        # Static instructions and context come first and the question last, so repeated questions over the same
+        # documents share a byte-identical prefix and the model server can reuse its KV cache for it.
         prompt = f"""
         You are an AI assistant designed to provide precise and factual answers based on the given context.
 
         **Instructions:**
-        - Answer the following question using only the provided context.
+        - Answer the question at the end using only the provided context.
         - Be clear, concise, and factual.
         - Return as much information as you can get from the context.
-        
-        **Question:** {question}
+
         **Context:**
         {context}
 
+        **Question:** {question}
+
         **Provide your answer below:**
         """
         return prompt
 
-    #Purpose: Generate a response by querying the LLM with question and relevant documents
-    def generate(self, question: str, documents: List[Document]) -> Dict:
+    #Purpose: Generate a response by querying the LLM with question and relevant documents.
+    #         When `on_token` is given, the answer is streamed and each text fragment is passed to it as it arrives.
+    #         `use_cache=False` skips cached answers (the new answer is still stored), e.g. when re-researching.
+    def generate(self, question: str, documents: List[Document], on_token: Optional[Callable[[str], None]] = None, use_cache: bool = True) -> Dict:
         """
         Generate an initial answer using the provided documents.
         """
-        print(f"ResearchAgent.generate called with question='{question}' and {len(documents)} documents.")
+        if on_token is not None:
+            return self.generate_stream(question, documents, on_token, use_cache=use_cache)
+        return self.generate_batch([(question, documents)], use_cache=use_cache)[0]
+
+    #Purpose: Generate responses for several (question, documents) pairs in a single round of concurrent requests.
+    #         The model server (Ollama with OLLAMA_NUM_PARALLEL, or vLLM) batches in-flight requests, so weights
+    #         are read once per decode step for every sequence in the batch instead of once per question.
+    def generate_batch(self, items: List[Tuple[str, List[Document]]], use_cache: bool = True) -> List[Dict]:
+        """
+        Generate initial answers for a batch of (question, documents) pairs.
+        """
+        print(f"ResearchAgent.generate_batch called with {len(items)} item(s).")
+
+        contexts = []
+        prompts = []
+        for question, documents in items:
+            context, prompt = self._prepare_prompt(question, documents)
+            contexts.append(context)
+            prompts.append(prompt)
+        print("Prompts created for the LLM.")
+
+        # Serve previously answered prompts from the response cache and only send the rest to the LLM.
+        # Identical prompts in one batch are sent once and share the answer.
+        results = [self._load_cached_response(prompt) if use_cache else None for prompt in prompts]
+        pending: Dict[str, List[int]] = {}
+        for i, result in enumerate(results):
+            if result is None:
+                pending.setdefault(prompts[i], []).append(i)
+        print(f"{sum(result is not None for result in results)} response(s) served from cache.")
+
+        if pending:
+            # Call the LLM to generate the answers
+            try:
+                print(f"Sending {len(pending)} prompt(s) to the model...")
+                responses = asyncio.run(self._chat_batch(list(pending)))
+                print("LLM responses received.")
+            except Exception as e:
+                print(f"Error during model inference: {e}")
+                raise RuntimeError("Failed to generate answer due to a model error.") from e
+
+            for (prompt, indices), response in zip(pending.items(), responses):
+                result = {
+                    "draft_answer": self._extract_answer(response),
+                    "context_used": contexts[indices[0]]
+                }
+                self._save_cached_response(prompt, result)
+                for i in indices:
+                    results[i] = dict(result)
+
+        return results
 
-        # Combine the top document contents into one string
-        context = "\n\n".join([doc.page_content for doc in documents])
+    #Purpose: Generate a single answer while streaming it token by token, so the UI can show it before it is complete
+    def generate_stream(self, question: str, documents: List[Document], on_token: Callable[[str], None], use_cache: bool = True) -> Dict:
+        """
+        Generate an initial answer, passing each streamed text fragment to `on_token`.
+        """
+        print(f"ResearchAgent.generate_stream called with question='{question}'.")
+        context, prompt = self._prepare_prompt(question, documents)
+
+        cached = self._load_cached_response(prompt) if use_cache else None
+        if cached is not None:
+            print("Response served from cache.")
+            on_token(cached["draft_answer"])
+            return cached
+
+        # Call the LLM and forward tokens as they arrive
+        try:
+            print("Streaming prompt to the model...")
+            parts = []
+            for token in self._chat_stream(prompt):
+                parts.append(token)
+                on_token(token)
+            print("LLM stream finished.")
+        except Exception as e:
+            print(f"Error during model inference: {e}")
+            raise RuntimeError("Failed to generate answer due to a model error.") from e
+
+        result = {
+            "draft_answer": self._extract_answer("".join(parts)),
+            "context_used": context
+        }
+        self._save_cached_response(prompt, result)
+        return result
+
+    #Purpose: Build the context string and the LLM prompt for one question
+    def _prepare_prompt(self, question: str, documents: List[Document]) -> Tuple[str, str]:
+        print(f"Preparing question='{question}' with {len(documents)} documents.")
+
+        # Combine the top document contents into one string. Documents are ordered by content hash so that
+        # retrieval reordering does not change the prompt prefix.
+        documents = sorted(documents, key=lambda doc: doc.metadata.get("sha256") or hashlib.sha256(doc.page_content.encode()).hexdigest())
+        context = self._build_context(documents)
         print(f"Combined context length: {len(context)} characters.")
 
         # Create a prompt for the LLM
-        prompt = self.generate_prompt(question, context)
-        print("Prompt created for the LLM.")
+        return context, self.generate_prompt(question, context)
+
+    #Purpose: Concatenate document contents with blank-line separators.
+    #Writes straight into a StringIO buffer instead of materializing an intermediate list of chunk strings.
+    def _build_context(self, documents: List[Document]) -> str:
+        buf = io.StringIO()
+        for i, doc in enumerate(documents):
+            if i:
+                buf.write("\n\n")
+            buf.write(doc.page_content)
+        return buf.getvalue()
+
+    #Purpose: Build the response-cache file path for a prompt (keyed on model + full prompt text)
+    def _response_cache_file(self, prompt: str) -> Path:
+        key = hashlib.sha256(f"{self.model}\n{prompt}".encode()).hexdigest()
+        return self._response_cache_path / f"{key}.json"
+
+    #Purpose: Load a cached answer for this prompt, if any.
+    #Only deterministic (temperature 0) generations are cached, otherwise sampling would be incorrectly deduplicated.
+    def _load_cached_response(self, prompt: str):
+        if self.temperature != 0:
+            return None
+
+        cache_file = self._response_cache_file(prompt)
+        if not cache_file.exists():
+            return None
 
-        # Call the LLM to generate the answer
         try:
-            print("Sending prompt to the model...")
-            # response = self.model.chat(
-            #     messages=[
-            #         {
-            #             "role": "user",
-            #             "content": prompt  # Ensure content is a string
-            #         }
-            #     ]
-            # )
-
-            response = ollama.chat(
+            with open(cache_file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable response cache entry {cache_file.name}: {e}")
+            return None
+
+    #Purpose: Store a generated answer in the response cache
+    def _save_cached_response(self, prompt: str, result: Dict) -> None:
+        if self.temperature != 0:
+            return
+
+        with open(self._response_cache_file(prompt), "w") as f:
+            json.dump(result, f)
+
+    #Purpose: Submit all prompts concurrently so they are decoded together by the model server.
+    #Returns the raw answer text for each prompt (empty string if the response could not be read).
+    async def _chat_batch(self, prompts: List[str]) -> List[str]:
+        if self.backend == "vllm":
+            return await self._vllm_chat_batch(prompts)
+        return await self._ollama_chat_batch(prompts)
+
+    async def _ollama_chat_batch(self, prompts: List[str]) -> List[str]:
+        client = ollama.AsyncClient()
+        responses = await asyncio.gather(*[
+            client.chat(
                 model = self.model,
                 messages = [
                     {
                     "role": "user",
                     "content": prompt
                     }
-                ]
+                ],
+                options = self.options,
+                keep_alive = -1 # keep the model (and its prompt cache) loaded instead of evicting it after 5 minutes
             )
+            for prompt in prompts
+        ])
 
-            print("LLM response received.")
-        except Exception as e:
-            print(f"Error during model inference: {e}")
-            raise RuntimeError("Failed to generate answer due to a model error.") from e
+        texts = []
+        for response in responses:
+            try:
+                texts.append(response['message']['content'])
+            except (IndexError, KeyError) as e:
+                print(f"Unexpected response structure: {e}")
+                texts.append("")
+        return texts
 
-        # Extract and process the LLM's response
-        try:
-            llm_response = response['message']['content'].strip()
-            print(f"Raw LLM response:\n{llm_response}")
-        except (IndexError, KeyError) as e:
-            print(f"Unexpected response structure: {e}")
-            llm_response = "I cannot answer this question based on the provided documents."
+    #vLLM schedules these requests with continuous batching: new prefills are chunked and interleaved with
+    #in-flight decodes, so one long RAG prompt does not stall the other users.
+    async def _vllm_chat_batch(self, prompts: List[str]) -> List[str]:
+        client = AsyncOpenAI(base_url=settings.VLLM_URL, api_key=settings.VLLM_API_KEY)
+        responses = await asyncio.gather(*[
+            client.chat.completions.create(
+                model = self.model,
+                messages = [
+                    {
+                    "role": "user",
+                    "content": prompt
+                    }
+                ],
+                temperature = self.temperature
+            )
+            for prompt in prompts
+        ])
+
+        texts = []
+        for response in responses:
+            try:
+                texts.append(response.choices[0].message.content or "")
+            except (IndexError, AttributeError) as e:
+                print(f"Unexpected response structure: {e}")
+                texts.append("")
+        return texts
+
+    #Purpose: Stream the answer for one prompt as a sequence of text fragments
+    def _chat_stream(self, prompt: str) -> Iterator[str]:
+        messages = [
+            {
+            "role": "user",
+            "content": prompt
+            }
+        ]
+
+        if self.backend == "vllm":
+            client = OpenAI(base_url=settings.VLLM_URL, api_key=settings.VLLM_API_KEY)
+            stream = client.chat.completions.create(
+                model = self.model,
+                messages = messages,
+                temperature = self.temperature,
+                stream = True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+
+        stream = ollama.chat(
+            model = self.model,
+            messages = messages,
+            options = self.options,
+            keep_alive = -1,
+            stream = True
+        )
+        for part in stream:
+            content = part['message']['content']
+            if content:
+                yield content
+
+    #Purpose: Clean the answer text returned by the LLM
+    def _extract_answer(self, llm_response: str) -> str:
+        llm_response = llm_response.strip()
+        print(f"Raw LLM response:\n{llm_response}")
 
         # Sanitize the response
         draft_answer = self.sanitize_response(llm_response) if llm_response else "I cannot answer this question based on the provided documents."
 
         print(f"Generated answer: {draft_answer}")
-
-        return {
-            "draft_answer": draft_answer,
-            "context_used": context
-        }
+        return draft_answer
     
 # === Stand-alone execution entrypoint ===
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Dict
+from typing import TypedDict, List, Dict, Callable, Optional
 from .research_agent import ResearchAgent
 from .verification_agent import VerificationAgent
 from .relevance_checker import RelevanceChecker
@@ -19,6 +19,8 @@ class AgentState(TypedDict):
     verification_report: str
     is_relevant: bool
     retriever: EnsembleRetriever
+    on_token: Optional[Callable[[str], None]] # receives streamed fragments of the research answer, if set
+    on_draft_start: Optional[Callable[[], None]] # called before each research answer is streamed
 
 class AgentWorkflow:
     def __init__(self):
@@ -93,7 +95,11 @@ class AgentWorkflow:
         print(f"[DEBUG] _decide_after_relevance_check -> {decision}")
         return decision
     
-    def full_pipeline(self, question: str, retriever: EnsembleRetriever):
+    # on_token (optional) is called with each streamed fragment of the draft answer. Streamed text is provisional:
+    # if verification triggers a re-research, a new draft is streamed after it; the returned dict is authoritative.
+    # on_draft_start (optional) is called before every draft starts streaming, so callers can discard the previous one.
+    def full_pipeline(self, question: str, retriever: EnsembleRetriever, on_token: Optional[Callable[[str], None]] = None,
+                      on_draft_start: Optional[Callable[[], None]] = None):
         try:
             print(f"[DEBUG] Starting full_pipeline with question='{question}'")
 
@@ -107,7 +113,9 @@ class AgentWorkflow:
                 draft_answer="",
                 verification_report="",
                 is_relevant=False,
-                retriever=retriever
+                retriever=retriever,
+                on_token=on_token,
+                on_draft_start=on_draft_start
             )
             
             final_state = self.compiled_workflow.invoke(initial_state)
@@ -122,7 +130,11 @@ class AgentWorkflow:
     
     def _research_step(self, state: AgentState) -> Dict:
         print(f"[DEBUG] Entered _research_step with question='{state['question']}'")
-        result = self.researcher.generate(state["question"], state["documents"]) #pass the question and the retrieved documents as arguments to generate
+        if state.get("on_draft_start"):
+            state["on_draft_start"]()
+        # A non-empty verification report means this is a re-research pass: skip the response cache so the
+        # identical prompt does not return the same rejected draft again.
+        result = self.researcher.generate(state["question"], state["documents"], on_token=state.get("on_token"), use_cache=not state.get("verification_report")) #pass the question and the retrieved documents as arguments to generate
         print("[DEBUG] Researcher returned draft answer.")
         return {"draft_answer": result["draft_answer"]}
     
@@ -1,8 +1,7 @@
 #====PURPOSE: GRADIO framework to provide a user-friendly interface for uploading documents, submitting queries, and retrieving AI-generated answers along with verification reports.
 
 import gradio as gr
-import hashlib
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import os
 
 from document_processor.file_handler import DocumentProcessor
@@ -10,6 +9,7 @@ from retriever.builder import RetrieverBuilder
 from agents.workflow import AgentWorkflow
 from config import constants, settings
 from utils.logging import logger
+from utils.hashing import hash_bytes
 
 # 1) Define some example data 
 #    (i.e. question + paths to documents relevant to that question).
@@ -161,11 +161,13 @@ def main():
                 if not uploaded_files:
                     raise ValueError("❌ No documents uploaded")
 
-                current_hashes = _get_file_hashes(uploaded_files)
+                files = _read_uploaded_files(uploaded_files)
+                file_hashes = _get_file_hashes(files)
+                current_hashes = frozenset(file_hashes)
                 
                 if state["retriever"] is None or current_hashes != state["file_hashes"]:
                     logger.info("Processing new/changed documents...")
-                    chunks = processor.process(uploaded_files)
+                    chunks = processor.process(files, file_hashes)
                     retriever = retriever_builder.build_hybrid_retriever(chunks)
                     
                     state.update({
@@ -192,13 +194,18 @@ def main():
 
     demo.launch(server_name="127.0.0.1", server_port=5000, share=True)
 
-def _get_file_hashes(uploaded_files: List) -> frozenset:
-    """Generate SHA-256 hashes for uploaded files."""
-    hashes = set()
+def _read_uploaded_files(uploaded_files: List) -> List[Tuple[str, bytes, int]]:
+    """Read each uploaded file from disk once into a (name, data, size) tuple."""
+    files = []
     for file in uploaded_files:
         with open(file.name, "rb") as f:
-            hashes.add(hashlib.sha256(f.read()).hexdigest())
-    return frozenset(hashes)
+            data = f.read()
+        files.append((os.path.basename(file.name), data, len(data)))
+    return files
+
+def _get_file_hashes(files: List[Tuple[str, bytes, int]]) -> List[str]:
+    """Generate content hashes for uploaded files."""
+    return [hash_bytes(data) for _, data, _ in files]
 
 if __name__ == "__main__":
     main()
@@ -1,25 +1,42 @@
 import streamlit as st
-import hashlib
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import os
+import time
 
 from document_processor.file_handler import DocumentProcessor
 from retriever.builder import RetrieverBuilder
 from agents.workflow import AgentWorkflow
 from config import constants, settings
 from utils.logging import logger
+from utils.hashing import hash_bytes
 
+# Minimum number of seconds between redraws of the streamed research draft
+STREAM_RENDER_INTERVAL = 0.1
 
+# Heavy components are process-wide singletons: Streamlit reruns the whole script on every widget interaction,
+# and st.cache_resource keeps one instance alive across reruns and sessions instead of rebuilding it each time.
+@st.cache_resource
+def get_processor() -> DocumentProcessor:
+    return DocumentProcessor() # initialize document processor to extract structured content from uploaded files
+
+@st.cache_resource
+def get_retriever_builder() -> RetrieverBuilder:
+    return RetrieverBuilder() #initialize hybrid retriever (BM25 + VectorSearch)
+
+@st.cache_resource
+def get_workflow() -> AgentWorkflow:
+    return AgentWorkflow() # Initialize workflow to orchestrate the multi-agent processing pipeline using LangGraph.
 
-def main():
 
-    processor = DocumentProcessor() # initialize document processor to extract structured content from uploaded files
-    retriever_builder = RetrieverBuilder() #initialize hybrid retriever (BM25 + VectorSearch)
-    workflow = AgentWorkflow() # Initialize workflow to orchestrate the multi-agent processing pipeline using LangGraph.
+def main():
 
-    # Page config
+    # Page config (must run before the cached factories, whose first call renders a spinner)
     st.set_page_config(page_title="ChattyDoc", layout="wide")
 
+    processor = get_processor()
+    retriever_builder = get_retriever_builder()
+    workflow = get_workflow()
+
     # ---- TOP NAVBAR ----
     st.markdown(
         """
@@ -88,7 +105,7 @@ def main():
         )
 
     # 5) Standard flow for question submission
-    def process_question(question_text: str, uploaded_files: List, state: Dict):
+    def process_question(question_text: str, uploaded_files: List, state: Dict, on_token=None, on_draft_start=None):
         """Handle questions with document caching."""
         # 1) Validate inputs
         if not question_text.strip():
@@ -101,13 +118,15 @@ def main():
         #     st.error("❌ Please select at least one source")
         #     st.stop()
     
-        #compute unique hashes for all uploaded files.
-        current_hashes = _get_file_hashes(uploaded_files) 
+        #read each upload once and compute unique hashes for all uploaded files.
+        files = _read_uploaded_files(uploaded_files)
+        file_hashes = _get_file_hashes(files)
+        current_hashes = frozenset(file_hashes)
 
         # 4) Rebuild retriever if needed
         if (st.session_state.retriever is None or current_hashes != st.session_state.file_hashes):
             logger.info("Building new retriever...")
-            chunks = processor.process(uploaded_files)
+            chunks = processor.process(files, file_hashes)
 
             #Build retriever object
             new_retriever = retriever_builder.build_hybrid_retriever(chunks)
@@ -129,7 +148,9 @@ def main():
         with st.spinner("Agents are thinking..."):
             result = workflow.full_pipeline(
                 question=question_text,
-                retriever=retriever
+                retriever=retriever,
+                on_token=on_token,
+                on_draft_start=on_draft_start
             )
         return result["draft_answer"], result["verification_report"], state
     
@@ -191,8 +212,26 @@ def main():
             #when user clicks Enter button
             if submit_btn:
                 
+                #Stream the research agent's draft into a placeholder while the agents run.
+                #The placeholder is redrawn at most every STREAM_RENDER_INTERVAL seconds instead of on every token.
+                stream_placeholder = st.empty()
+                streamed_parts = []
+                last_render = [0.0]
+
+                def show_token(token: str):
+                    streamed_parts.append(token)
+                    now = time.monotonic()
+                    if now - last_render[0] >= STREAM_RENDER_INTERVAL:
+                        stream_placeholder.markdown("".join(streamed_parts))
+                        last_render[0] = now
+
+                #a re-research streams a new draft: drop the rejected one
+                def start_draft():
+                    streamed_parts.clear()
+                    stream_placeholder.empty()
+
                 #Run the workflow to process document and return answer and verification, state
-                ai_response, verif, new_state = process_question(question_text, uploaded_files, st.session_state)
+                ai_response, verif, new_state = process_question(question_text, uploaded_files, st.session_state, on_token=show_token, on_draft_start=start_draft)
 
                 #save results to session_state
                 st.session_state.final_response = ai_response
@@ -238,19 +277,18 @@ def main():
                 key = "verification_display" 
             )
         
-#Purpose: Ensures same file not loaded more than once
-def _get_file_hashes(uploaded_files: List) -> frozenset:
-    """Generate SHA-256 hashes for uploaded files."""
-    hashes = set()
+#Purpose: Read every Streamlit upload exactly once into a (name, data, size) tuple
+def _read_uploaded_files(uploaded_files: List) -> List[Tuple[str, bytes, int]]:
+    files = []
     for file in uploaded_files:
-        # 1. Get the bytes directly from the Streamlit UploadedFile object
-        file_bytes = file.getvalue()
-        
-        # 2. Hash the bytes
-        file_hash = hashlib.sha256(file_bytes).hexdigest()
-        hashes.add(file_hash)
-        
-    return frozenset(hashes)
+        data = file.getvalue()
+        files.append((file.name, data, len(data)))
+    return files
+
+#Purpose: Ensures same file not loaded more than once
+def _get_file_hashes(files: List[Tuple[str, bytes, int]]) -> List[str]:
+    """Generate content hashes for uploaded files, in upload order."""
+    return [hash_bytes(data) for _, data, _ in files]
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
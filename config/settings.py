@@ -14,11 +14,31 @@ class Settings(BaseSettings):
     # Database settings
     CHROMA_DB_PATH: str = "./chroma_db"
     CHROMA_COLLECTION_NAME: str = "documents"
+    # HNSW index parameters, applied when the collection is first created
+    CHROMA_HNSW_METADATA: dict = {"hnsw:M": 16, "hnsw:construction_ef": 200, "hnsw:space": "cosine"}
+
+    # Chunking settings (characters per chunk after header splitting)
+    CHUNK_SIZE: int = 512
+    CHUNK_OVERLAP: int = 64
 
     # Retrieval settings
     VECTOR_SEARCH_K: int = 10
     HYBRID_RETRIEVER_WEIGHTS: list = [0.4, 0.6]
 
+    # Generation settings
+    # LLM_BACKEND selects where the research agent sends requests: "ollama" or "vllm".
+    # The vLLM server is expected to run as a sidecar on port 8001 (port 8000 is taken by fastapi_wrapper.py), e.g.
+    #   vllm serve meta-llama/Llama-3.2-11B-Vision-Instruct --port 8001 --enable-chunked-prefill \
+    #       --max-num-batched-tokens 2048 --enable-prefix-caching --max-num-seqs 64
+    LLM_BACKEND: str = "ollama"
+    OLLAMA_MODEL: str = "llama3.2-vision:11b-instruct-q4_K_M"
+    VLLM_URL: str = "http://localhost:8001/v1"
+    VLLM_MODEL: str = "meta-llama/Llama-3.2-11B-Vision-Instruct"
+    VLLM_API_KEY: str = "EMPTY"
+    # Sampling temperature sent with every research request. Defaults to 0 (greedy decoding): research answers are
+    # only cached on disk when generation is deterministic, so any other value disables the response cache.
+    RESEARCH_TEMPERATURE: float = 0.0
+
     # Logging settings
     LOG_LEVEL: str = "INFO"
 
@@ -1,18 +1,24 @@
 import os
 import hashlib
+import multiprocessing
 import pickle
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from io import BytesIO
 from docling.datamodel.base_models import DocumentStream
 from docling.document_converter import DocumentConverter
 
-from langchain_text_splitters import MarkdownHeaderTextSplitter
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from langchain.schema import Document
 from config import constants
 from config.settings import settings
 from utils.logging import logger
+from utils.hashing import hash_bytes
 
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
 
 #class responsible for handling document parsing, caching, and chunking.
 
@@ -23,18 +29,24 @@ from utils.logging import logger
 class DocumentProcessor:
 
     #initialize document processor with 1) a predefined header structure for markdown-based chunking. 2) A cache directory for storing
-    #document chunks 3) ensures cache directory exists.
+    #document chunks 3) ensures cache directory exists. 4) opens the SQLite chunk cache inside the cache directory.
     def __init__(self):
         self.headers = [("#", "Header 1"), ("##", "Header 2")]
         self.cache_dir = Path(settings.CACHE_DIR)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        #single keyed store for all cached files: one indexed lookup per file instead of a file open + stat,
+        #atomic writes, and WAL mode so concurrent sessions/workers can read while another process writes.
+        self.db = sqlite3.connect(self.cache_dir / "chunks.db", isolation_level=None, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS chunks(hash TEXT PRIMARY KEY, ts INTEGER, blob BLOB)")
         
     #Purpose: ensures that the total size of uploaded files doesn't exceed a predefined limit
     #How it works: 1) Computes the total size of all uploaded files 2) Compares the total size against a fixed max total size
     #              3) Raises a 'ValueError' if the limit is exceeded.
-    def validate_files(self, files: List) -> None:
+    def validate_files(self, files: List[Tuple[str, bytes, int]]) -> None:
         """Validate the total size of the uploaded files."""
-        total_size = sum(f.size for f in files)
+        total_size = sum(size for _, _, size in files)
         if total_size > constants.MAX_TOTAL_SIZE:
             raise ValueError(f"Total size exceeds {constants.MAX_TOTAL_SIZE//1024//1024}MB limit")
     
@@ -45,61 +57,95 @@ class DocumentProcessor:
     # 3) If cached, load data from cache. Else process the file using _process_file() method and store results in cache.
     # 4) Ensures that no duplicate chunks are stored across multiple files.
     # 5) Returns all file chunks
+    # Files are passed as (name, data, size) tuples so each upload's bytes are read once by the caller and reused for
+    # hashing, conversion and caching. Callers that already hashed the uploads can pass them as `file_hashes`.
 
-    def process(self, files: List) -> List:
+    def process(self, files: List[Tuple[str, bytes, int]], file_hashes: Optional[List[str]] = None) -> List:
         """Process files with caching for subsequent queries"""
         self.validate_files(files)
         all_chunks = []
         seen_hashes = set()
-        
-        for file in files:
+
+        # Hash every upload and check the chunk cache on the calling thread; cache hits never touch the pool
+        payloads = []
+        results = {}
+        for i, (name, data, _) in enumerate(files):
             try:
                 # Generate content-based hash for caching
-                # with open(file.name, "rb") as f:
-                #     file_hash = self._generate_hash(f.read())
-                file_hash = self._generate_hash(file.read())
-                
-                cache_path = self.cache_dir / f"{file_hash}.pkl" #create path to cache path.
-                
-                #check if file is already cached and load from cache
-                if self._is_cache_valid(cache_path):
-                    logger.info(f"Loading from cache: {file.name}")
-                    chunks = self._load_from_cache(cache_path)
-
-                #if not cached, process the file and store in cache
-                else:
-                    logger.info(f"Processing and caching: {file.name}")
-                    chunks = self._process_file(file) #split file into structured text chunks
-                    self._save_to_cache(chunks, cache_path)
-                
-                # Deduplicate chunks across files
-                for chunk in chunks:
-                    chunk_hash = self._generate_hash(chunk.page_content.encode()) #generate unique hash per chunk
-                    if chunk_hash not in seen_hashes:
-                        all_chunks.append(chunk)
-                        seen_hashes.add(chunk_hash)
-                        
+                file_hash = file_hashes[i] if file_hashes else hash_bytes(data)
+                if file_hash not in results:
+                    results[file_hash] = self._load_from_cache(file_hash)
+                    if results[file_hash] is not None:
+                        logger.info(f"Loading from cache: {name}")
+                #queued only once the lookup succeeded, so a file that failed to read is skipped below
+                payloads.append((data, name, file_hash))
             except Exception as e:
-                logger.error(f"Failed to process {file.name}: {str(e)}")
+                logger.error(f"Failed to read {name}: {str(e)}")
+
+        #skip unsupported files here so they never need a worker
+        misses = []
+        for data, name, file_hash in payloads:
+            if results[file_hash] is not None:
                 continue
-                
+            if not name.endswith(SUPPORTED_EXTENSIONS):
+                logger.warning(f"Skipping unsupported file type: {name}")
+                results[file_hash] = []
+                continue
+            misses.append((data, name, file_hash))
+            results[file_hash] = [] #queued once even if the same file was uploaded twice
+
+        # A single uncached file (the common single-upload case) is converted in place: a spawned worker would
+        # first have to re-import Docling and its models.
+        if len(misses) == 1:
+            data, name, file_hash = misses[0]
+            try:
+                results[file_hash] = self._process_and_cache(data, name, file_hash)
+            except Exception as e:
+                logger.error(f"Failed to process {name}: {str(e)}")
+
+        # Docling conversion is CPU-bound, so several uncached files are converted in parallel across processes.
+        # Workers are spawned rather than forked so they do not inherit the SQLite connection or the locks of
+        # threads running in the host server.
+        elif misses:
+            max_workers = min(len(misses), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(_process_one, *miss) for miss in misses]
+                for (_, name, file_hash), future in zip(misses, futures):
+                    try:
+                        results[file_hash] = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to process {name}: {str(e)}")
+
+        # Merge results in upload order so deduplication is deterministic
+        for _, name, file_hash in payloads:
+            # Deduplicate chunks across files
+            for chunk in results[file_hash]:
+                chunk_hash = self._chunk_hash(chunk) #unique hash per chunk, computed once in _process_file
+                if chunk_hash not in seen_hashes:
+                    chunk.metadata["file_hash"] = file_hash #lets the retriever index each file separately
+                    all_chunks.append(chunk)
+                    seen_hashes.add(chunk_hash)
+
         logger.info(f"Total unique chunks: {len(all_chunks)}")
         return all_chunks
 
+    #Purpose: Process a file that is not in the cache and store its chunks
+    def _process_and_cache(self, file_bytes: bytes, name: str, file_hash: str) -> List:
+        logger.info(f"Processing and caching: {name}")
+        chunks = self._process_file(name, file_bytes) #split file into structured text chunks
+        self._save_to_cache(chunks, file_hash)
+        return chunks
+
     #Purpose: Converts the documents into Markdown and splits it into structured text chunks
-    def _process_file(self, file) -> List:
+    def _process_file(self, name: str, file_bytes: bytes) -> List:
         """Original processing logic with Docling"""
         #skip unsupported files
-        if not file.name.endswith(('.pdf', '.docx', '.txt', '.md')):
-            logger.warning(f"Skipping unsupported file type: {file.name}")
+        if not name.endswith(SUPPORTED_EXTENSIONS):
+            logger.warning(f"Skipping unsupported file type: {name}")
             return []
-        
-        #Get the document bytes and wrap them in BytesIO "buffer"
-        file_bytes = BytesIO(file.getvalue())
-
-        #Create a Docling DocumentStream
 
-        source = DocumentStream(name=file.name, stream=file_bytes)
+        #Create a Docling DocumentStream over the document bytes wrapped in a BytesIO "buffer"
+        source = DocumentStream(name=name, stream=BytesIO(file_bytes))
 
         #uses Docling 'DocumentConverter' to convert file to Markdown
         converter = DocumentConverter()
@@ -108,34 +154,69 @@ class DocumentProcessor:
 
         #Split extracted Markdown text into chunks
         splitter = MarkdownHeaderTextSplitter(self.headers)
-        return splitter.split_text(markdown)
-
-    #Purpose: Generate a unique SHA-256 hash from doucment content
+        header_chunks = splitter.split_text(markdown)
+
+        #Bound the size of each chunk: documents with sparse headers otherwise produce sections larger than the
+        #embedding model's context. Header metadata is carried over to every sub-chunk.
+        size_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        chunks = size_splitter.split_documents(header_chunks)
+
+        #Hash every chunk exactly once; the hash is cached with the chunk and reused for deduplication and as the
+        #vector store id, so cache hits never re-hash chunk contents.
+        for chunk in chunks:
+            chunk.metadata["sha256"] = self._generate_hash(chunk.page_content.encode())
+        return chunks
+
+    #Purpose: Generate a unique SHA-256 hash from chunk content
     def _generate_hash(self, content: bytes) -> str:
         return hashlib.sha256(content).hexdigest()
 
-    #Save processed document chunks in a pickle file for future use
-    def _save_to_cache(self, chunks: List, cache_path: Path):
-        
+    #Purpose: Get a chunk's content hash, falling back to hashing for chunks cached before it was stored
+    def _chunk_hash(self, chunk) -> str:
+        chunk_hash = chunk.metadata.get("sha256")
+        if chunk_hash is None:
+            chunk_hash = chunk.metadata["sha256"] = self._generate_hash(chunk.page_content.encode())
+        return chunk_hash
+
+    #Save processed document chunks in the SQLite cache for future use
+    #Chunks are pickled column-wise (texts and metadata lists) with the highest pickle protocol, which keeps the
+    #blob smaller and faster to load than pickling a list of Document objects.
+    def _save_to_cache(self, chunks: List, file_hash: str):
+        blob = pickle.dumps({
+            "texts": [chunk.page_content for chunk in chunks],
+            "metadatas": [chunk.metadata for chunk in chunks]
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
         #store chunks with timestanp for expiration checking
-        with open(cache_path, "wb") as f:
-            pickle.dump({
-                "timestamp": datetime.now().timestamp(),
-                "chunks": chunks
-            }, f)
-
-    #Purpose: Load cached document chunks from a previously processed file
-    def _load_from_cache(self, cache_path: Path) -> List:
-        with open(cache_path, "rb") as f:
-            data = pickle.load(f)
-        return data["chunks"]
-
-    #Purpose: Check if cached file is still valid (not expired)
-    def _is_cache_valid(self, cache_path: Path) -> bool:
-        if not cache_path.exists():
-            return False
-        
-        #compare modification timestamp of cached file against CACHE_EXPIRE_DAYS
-        #if file is older than expiration threshold, it is considered invalid.
-        cache_age = datetime.now() - datetime.fromtimestamp(cache_path.stat().st_mtime)
-        return cache_age < timedelta(days=settings.CACHE_EXPIRE_DAYS)
\ No newline at end of file
+        self.db.execute(
+            "INSERT OR REPLACE INTO chunks(hash, ts, blob) VALUES (?, ?, ?)",
+            (file_hash, int(datetime.now().timestamp()), blob)
+        )
+
+    #Purpose: Load cached document chunks from a previously processed file. Returns None on a miss or expired entry.
+    def _load_from_cache(self, file_hash: str) -> Optional[List]:
+        row = self.db.execute("SELECT ts, blob FROM chunks WHERE hash = ?", (file_hash,)).fetchone()
+        if row is None or not self._is_cache_valid(row[0]):
+            return None
+
+        data = pickle.loads(row[1])
+        return [Document(page_content=text, metadata=metadata) for text, metadata in zip(data["texts"], data["metadatas"])]
+
+    #Purpose: Check if a cache entry is still valid (not expired)
+    def _is_cache_valid(self, timestamp: int) -> bool:
+        #compare the entry's write timestamp against CACHE_EXPIRE_DAYS
+        #if the entry is older than expiration threshold, it is considered invalid.
+        cache_age = datetime.now() - datetime.fromtimestamp(timestamp)
+        return cache_age < timedelta(days=settings.CACHE_EXPIRE_DAYS)
+
+
+#Purpose: Worker entrypoint for the process pool used by DocumentProcessor.process.
+#It lives at module level so it can be pickled; each worker builds its own processor from the shared settings.
+#The caller has already checked the cache, so the worker only converts the file and stores the result.
+def _process_one(file_bytes: bytes, name: str, file_hash: str) -> List:
+    """Process and cache a single uncached file in a worker process"""
+    return DocumentProcessor()._process_and_cache(file_bytes, name, file_hash)
\ No newline at end of file
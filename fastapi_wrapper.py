@@ -1,8 +1,11 @@
 import uvicorn
-import hashlib
-import io
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
 # Import your existing custom logic
@@ -10,15 +13,40 @@ from document_processor.file_handler import DocumentProcessor
 from retriever.builder import RetrieverBuilder
 from agents.workflow import AgentWorkflow
 from utils.logging import logger
-
-# 1. Initialize FastAPI App
+from utils.hashing import hash_bytes
+
+# 1. Core Components (Singletons)
+# Built lazily instead of at import time: DocumentProcessor's spawned workers re-import this script as
+# __mp_main__, and must not open a second Chroma client or load the agents' models.
+@lru_cache(maxsize=None)
+def get_processor() -> DocumentProcessor:
+    return DocumentProcessor()
+
+@lru_cache(maxsize=None)
+def get_retriever_builder() -> RetrieverBuilder:
+    return RetrieverBuilder()
+
+@lru_cache(maxsize=None)
+def get_workflow() -> AgentWorkflow:
+    return AgentWorkflow()
+
+# Build the components once when the server starts rather than on the first request
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_processor()
+    get_retriever_builder()
+    get_workflow()
+    yield
+
+# 2. Initialize FastAPI App
 app = FastAPI(
     title="ChattyDoc API",
     description="Backend API for multi-agent document research and verification",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# 2. Enable CORS
+# 3. Enable CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -27,26 +55,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 3. Initialize Core Components (Singletons)
-processor = DocumentProcessor()
-retriever_builder = RetrieverBuilder()
-workflow = AgentWorkflow()
-
 # Global variables to simulate session state
 GLOBAL_STATE = {
     "retriever": None,
     "file_hashes": frozenset()
 }
 
-# --- Helper Function for Hashing ---
-async def _get_api_file_hashes(files: List[UploadFile]) -> frozenset:
-    hashes = set()
-    for file in files:
-        content = await file.read()
-        file_hash = hashlib.sha256(content).hexdigest()
-        hashes.add(file_hash)
-        await file.seek(0)  # Reset pointer so processor can read it
-    return frozenset(hashes)
+# Guards GLOBAL_STATE so concurrent requests never observe a half-swapped retriever
+STATE_LOCK = asyncio.Lock()
+
+# --- Helper Function for Reading & Hashing ---
+async def _read_api_files(files: List[UploadFile]) -> tuple:
+    """Read each upload once into a (name, data, size) tuple and hash it."""
+    payloads = []
+    for f in files:
+        content = await f.read()
+        payloads.append((f.filename, content, len(content)))
+    file_hashes = [hash_bytes(content) for _, content, _ in payloads]
+    return payloads, file_hashes
+
+# --- Helper Function for Indexing ---
+async def _prepare_retriever(question: str, files: Optional[List[UploadFile]]) -> tuple:
+    """Index new uploads if needed (Steps A-C) and return (retriever, number of files it covers)."""
+    global GLOBAL_STATE
+
+    # Step A: Document Processing & Indexing
+    # A request that uploads files answers with the retriever for exactly those files, even if another request
+    # swaps GLOBAL_STATE while this one is still indexing.
+    if files and len(files) > 0:
+        payloads, file_hashes = await _read_api_files(files)
+        current_hashes = frozenset(file_hashes)
+
+        async with STATE_LOCK:
+            retriever = GLOBAL_STATE["retriever"] if current_hashes == GLOBAL_STATE["file_hashes"] else None
+
+        # Only rebuild if files changed or no retriever exists
+        if retriever is None:
+            logger.info("Building new retriever for API request...")
+            
+            # Process the uploads off the event loop (Docling conversion is blocking)
+            chunks = await asyncio.to_thread(get_processor().process, payloads, file_hashes)
+            
+            if not chunks:
+                raise HTTPException(status_code=400, detail="No text content extracted.")
+
+            # Build hybrid retriever
+            retriever = await asyncio.to_thread(get_retriever_builder().build_hybrid_retriever, chunks)
+            
+            # Update State
+            async with STATE_LOCK:
+                GLOBAL_STATE["retriever"] = retriever
+                GLOBAL_STATE["file_hashes"] = current_hashes
+        else:
+            logger.info("Using cached retriever.")
+    else:
+        # No uploads: answer with the most recently indexed documents
+        async with STATE_LOCK:
+            retriever = GLOBAL_STATE["retriever"]
+            current_hashes = GLOBAL_STATE["file_hashes"]
+
+    # Step B: Safety Check
+    if retriever is None:
+        raise HTTPException(
+            status_code=400, 
+            detail="No documents found. Please upload documents."
+        )
+
+    # Step C: Question Check
+    if not question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+
+    return retriever, len(current_hashes)
 
 # 4. API Endpoints
 
@@ -59,59 +138,14 @@ async def chat_endpoint(
     question: str = Form(...),
     files: Optional[List[UploadFile]] = File(None)
 ):
-    global GLOBAL_STATE
-
     try:
-        # Step A: Document Processing & Indexing
-        if files and len(files) > 0:
-            current_hashes = await _get_api_file_hashes(files)
-
-            # Only rebuild if files changed or no retriever exists
-            if GLOBAL_STATE["retriever"] is None or current_hashes != GLOBAL_STATE["file_hashes"]:
-                logger.info("Building new retriever for API request...")
-                
-                # --- Compatibility Layer: Convert FastAPI files to 'Streamlit-like' objects ---
-                sync_files = []
-                for f in files:
-                    content = await f.read()
-                    # Wrap bytes in a buffer that supports the Buffer API
-                    buf = io.BytesIO(content)
-                    # Add attributes your DocumentProcessor expects (.name and .size)
-                    buf.name = f.filename
-                    buf.size = len(content) 
-                    sync_files.append(buf)
-                
-                # Process the "faked" sync files
-                chunks = processor.process(sync_files)
-                
-                if not chunks:
-                    raise HTTPException(status_code=400, detail="No text content extracted.")
-
-                # Build hybrid retriever
-                new_retriever = retriever_builder.build_hybrid_retriever(chunks)
-                
-                # Update State
-                GLOBAL_STATE["retriever"] = new_retriever
-                GLOBAL_STATE["file_hashes"] = current_hashes
-            else:
-                logger.info("Using cached retriever.")
-
-        # Step B: Safety Check
-        retriever = GLOBAL_STATE["retriever"]
-        if retriever is None:
-            raise HTTPException(
-                status_code=400, 
-                detail="No documents found. Please upload documents."
-            )
-
-        # Step C: Execution
-        if not question.strip():
-            raise HTTPException(status_code=400, detail="Question cannot be empty.")
+        retriever, files_indexed = await _prepare_retriever(question, files)
 
         logger.info(f"Executing workflow for question: {question}")
         
-        # Run your LangGraph / Agentic pipeline
-        result = workflow.full_pipeline(
+        # Run your LangGraph / Agentic pipeline in a worker thread so other requests keep being served
+        result = await asyncio.to_thread(
+            get_workflow().full_pipeline,
             question=question,
             retriever=retriever
         )
@@ -123,7 +157,7 @@ async def chat_endpoint(
                 "answer": result.get("draft_answer"),
                 "verification": result.get("verification_report"),
                 "metadata": {
-                    "files_indexed": len(GLOBAL_STATE["file_hashes"]),
+                    "files_indexed": files_indexed,
                     "sources_consulted": len(result.get("source_documents", []))
                 }
             }
@@ -134,6 +168,63 @@ async def chat_endpoint(
         # Return 500 for backend logic crashes, 400 for user input issues
         raise HTTPException(status_code=500, detail=str(e))
 
+#Streaming variant of /chat: the research agent's draft is sent as Server-Sent Events while it is generated.
+#Events: "reset" (a new draft starts; discard the draft text received so far), "token" (a text fragment of the
+#current draft), then a final "result" (answer + verification report) or "error".
+#A re-research after a failed verification sends another "reset" followed by the new draft's tokens.
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    question: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None)
+):
+    try:
+        retriever, _ = await _prepare_retriever(question, files)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Critical API Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Executing streaming workflow for question: {question}")
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    # Called from the worker thread running the pipeline; hand tokens back to the event loop
+    def on_token(token: str):
+        loop.call_soon_threadsafe(events.put_nowait, ("token", token))
+
+    def on_draft_start():
+        loop.call_soon_threadsafe(events.put_nowait, ("reset", None))
+
+    async def run_pipeline():
+        try:
+            result = await asyncio.to_thread(
+                get_workflow().full_pipeline,
+                question=question,
+                retriever=retriever,
+                on_token=on_token,
+                on_draft_start=on_draft_start
+            )
+            await events.put(("result", {
+                "answer": result.get("draft_answer"),
+                "verification": result.get("verification_report")
+            }))
+        except Exception as e:
+            logger.error(f"Streaming workflow failed: {str(e)}")
+            await events.put(("error", str(e)))
+
+    async def event_stream():
+        pipeline = asyncio.create_task(run_pipeline())
+        while True:
+            event, data = await events.get()
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            if event not in ("token", "reset"):
+                break
+        await pipeline
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # 5. Execution Block
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -7,15 +7,23 @@ from langchain_community.vectorstores import Chroma
 #from langchain_openai import OpenAIEmbeddings
 from ibm_watsonx_ai.metanames import EmbedTextParamsMetaNames
 #from langchain_ibm import WatsonxEmbeddings
-from langchain_community.embeddings import OllamaEmbeddings
+#from langchain_community.embeddings import OllamaEmbeddings
 #from langchain_ollama import OllamaEmbeddings
+from .embeddings import BatchedOllamaEmbeddings
+from .ensemble import ConcurrentEnsembleRetriever
 from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
+from langchain_community.retrievers.bm25 import default_preprocessing_func
+from rank_bm25 import BM25Okapi
 from config.settings import settings
+from typing import Dict, List, Tuple
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of new chunks embedded and written to Chroma per add_documents call
+CHROMA_ADD_BATCH_SIZE = 1000
+
 #Purpose: Implements hybrid retrieval system combining 1) BM25 (Lexical Search - keyword-based retrieval) and 2) Vector Search (Embedding-search; semantic retrieval using embeddings)
 #Why? Captures both exact keyword matches and semantically similar content
 
@@ -38,34 +46,93 @@ class RetrieverBuilder:
         # )
         # self.embeddings = watsonx_embedding
 
-        self.embeddings = OllamaEmbeddings(
-            model = "nomic-embed-text"
+        # Batched variant of OllamaEmbeddings: one request per 32 chunks instead of one per chunk
+        self.embeddings = BatchedOllamaEmbeddings(
+            model = "nomic-embed-text",
+            batch_size = 32
+        )
+
+        # Open the persistent Chroma collection once; rebuilds only add chunks it has not seen yet
+        self.vector_store = Chroma(
+            collection_name=settings.CHROMA_COLLECTION_NAME,
+            embedding_function=self.embeddings,
+            persist_directory=settings.CHROMA_DB_PATH,
+            collection_metadata=settings.CHROMA_HNSW_METADATA # bounded graph degree / build effort for predictable query cost
         )
 
+        # Tokenized BM25 corpus per file, keyed by file hash -> (chunk ids it was built from, tokens of each chunk)
+        self._bm25_cache: Dict[str, Tuple[Tuple[str, ...], List[List[str]]]] = {}
+
+    #Purpose: Content-based id of a chunk, shared by the vector store and the BM25 cache.
+    #Uses the SHA-256 computed once by DocumentProcessor when the chunk was created.
+    def _doc_id(self, doc) -> str:
+        return doc.metadata.get("sha256") or hashlib.sha256(doc.page_content.encode()).hexdigest()
+
+    #Purpose: Embed and store only the chunks that are not already in the vector store.
+    #Chunks are keyed by the SHA-256 of their content, so a re-uploaded file costs no embedding calls.
+    def _add_new_documents(self, docs, doc_ids: List[str]) -> None:
+        ids_to_docs = dict(zip(doc_ids, docs))
+        if not ids_to_docs:
+            return
+
+        existing_ids = set(self.vector_store._collection.get(ids=list(ids_to_docs), include=[])["ids"])
+        new_ids = [doc_id for doc_id in ids_to_docs if doc_id not in existing_ids]
+        logger.info(f"{len(existing_ids)} chunks already indexed, embedding {len(new_ids)} new chunks.")
+
+        for i in range(0, len(new_ids), CHROMA_ADD_BATCH_SIZE):
+            batch_ids = new_ids[i:i + CHROMA_ADD_BATCH_SIZE]
+            self.vector_store.add_documents([ids_to_docs[doc_id] for doc_id in batch_ids], ids=batch_ids)
+
+    #Purpose: Build a BM25 retriever over all docs, tokenizing only files that have not been indexed before.
+    #Chunks are grouped by the "file_hash" metadata set in DocumentProcessor.process; a file's cached tokens are reused
+    #as long as they were built from exactly the same chunks. One index is built over the combined corpus so IDF
+    #statistics are global across all uploaded files.
+    def _build_bm25(self, docs, doc_ids: List[str]) -> BM25Retriever:
+        groups: Dict[str, Tuple[List, List[str]]] = {}
+        for doc, doc_id in zip(docs, doc_ids):
+            group_docs, group_ids = groups.setdefault(doc.metadata.get("file_hash", ""), ([], []))
+            group_docs.append(doc)
+            group_ids.append(doc_id)
+
+        bm25_cache = {}
+        corpus_docs = []
+        corpus = []
+        for file_hash, (group_docs, group_ids) in groups.items():
+            cached = self._bm25_cache.get(file_hash)
+            if cached is None or cached[0] != tuple(group_ids):
+                logger.info(f"Tokenizing {len(group_docs)} chunks for BM25 index of file {file_hash[:12]}")
+                cached = (tuple(group_ids), [default_preprocessing_func(doc.page_content) for doc in group_docs])
+            bm25_cache[file_hash] = cached
+            corpus_docs.extend(group_docs)
+            corpus.extend(cached[1])
+
+        # Only keep tokens for the files in the current upload set
+        self._bm25_cache = bm25_cache
+        return BM25Retriever(
+            vectorizer=BM25Okapi(corpus),
+            docs=corpus_docs,
+            preprocess_func=default_preprocessing_func
+        )
 
-        
     def build_hybrid_retriever(self, docs):
         """Build a hybrid retriever using BM25 and vector-based retrieval."""
         try:
-            # Create Chroma vector store
+            # Update Chroma vector store
             # Stores documents embeddings using ChromaDB, and allows fast vector-based similarity search
-            vector_store = Chroma.from_documents(
-                documents=docs,
-                embedding=self.embeddings,
-                persist_directory=settings.CHROMA_DB_PATH
-            )
-            logger.info("Vector store created successfully.")
+            doc_ids = [self._doc_id(doc) for doc in docs]
+            self._add_new_documents(docs, doc_ids)
+            logger.info("Vector store updated successfully.")
             
             # Create BM25 retriever which uses TF-IDF scoring and ranks documents based on keyword relevance.
-            bm25 = BM25Retriever.from_documents(docs)
+            bm25 = self._build_bm25(docs, doc_ids)
             logger.info("BM25 retriever created successfully.")
             
             # Create vector-based retriever, which retrieve documents based on vector similarity and returns top-k most relevant results
-            vector_retriever = vector_store.as_retriever(search_kwargs={"k": settings.VECTOR_SEARCH_K})
+            vector_retriever = self.vector_store.as_retriever(search_kwargs={"k": settings.VECTOR_SEARCH_K})
             logger.info("Vector retriever created successfully.")
             
-            # Combine retrievers into a hybrid retriever
-            hybrid_retriever = EnsembleRetriever(
+            # Combine retrievers into a hybrid retriever (sub-retrievers are queried concurrently)
+            hybrid_retriever = ConcurrentEnsembleRetriever(
                 retrievers=[bm25, vector_retriever],
                 weights=settings.HYBRID_RETRIEVER_WEIGHTS #Adjust importance of lexical vs. vector search
             )
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+import asyncio
+import httpx
+from langchain_community.embeddings import OllamaEmbeddings
+from pydantic import PrivateAttr
+import logging
+
+logger = logging.getLogger(__name__)
+
+#Purpose: OllamaEmbeddings variant that embeds texts in batches instead of one HTTP round-trip per chunk.
+#How it works: splits the texts into groups of `batch_size`, POSTs each group to Ollama's /api/embed endpoint
+# (which accepts an array of inputs) and sends all groups concurrently. Embeddings come back in the original order.
+# Query embeddings are memoized by question text, and duplicate texts in one embed_documents call are embedded once.
+
+class BatchedOllamaEmbeddings(OllamaEmbeddings):
+    batch_size: int = 32
+    """Number of texts sent to Ollama in a single /api/embed request."""
+    query_cache_size: int = 4096
+    """Maximum number of query embeddings kept in the LRU cache."""
+    timeout: Optional[float] = None
+    """Seconds to wait for each /api/embed request. None waits until Ollama answers."""
+
+    _query_cache: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        # The same question is embedded by several agents per user query; answer repeats from memory
+        self._query_cache = lru_cache(maxsize=self.query_cache_size)(self._embed_query_uncached)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the cached vector for previously seen question text."""
+        return list(self._query_cache(text))
+
+    def _embed_query_uncached(self, text: str) -> Tuple[float, ...]:
+        return tuple(super().embed_query(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, sending each distinct text to Ollama only once."""
+        unique_texts = list(dict.fromkeys(texts))
+        embeddings = dict(zip(unique_texts, super().embed_documents(unique_texts)))
+        return [embeddings[text] for text in texts]
+
+    def _embed(self, input: List[str]) -> List[List[float]]:
+        """Embed a list of (instruction-prefixed) texts through batched /api/embed calls."""
+        if not input:
+            return []
+        return asyncio.run(self._aembed_batches(input))
+
+    async def _aembed_batches(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches.")
+
+        async with httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=self.timeout) as client:
+            results = await asyncio.gather(*[self._aembed_batch(client, batch) for batch in batches])
+
+        # Flatten per-batch results back into the original order
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    async def _aembed_batch(self, client: httpx.AsyncClient, batch: List[str]) -> List[List[float]]:
+        response = await client.post("/api/embed", json={"input": batch, **self._default_params})
+        if response.status_code != 200:
+            raise ValueError(
+                f"Error raised by inference API HTTP code: {response.status_code}, {response.text}"
+            )
+
+        embeddings = response.json().get("embeddings", [])
+        if len(embeddings) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings from Ollama, received {len(embeddings)}")
+        return embeddings
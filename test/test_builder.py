@@ -0,0 +1,76 @@
+from langchain.schema import Document
+from langchain_community.retrievers import BM25Retriever
+
+from config.settings import settings
+from retriever import builder as builder_module
+from retriever.builder import RetrieverBuilder
+
+
+### 🔹 RetrieverBuilder over a throwaway Chroma directory, counting BM25 tokenization
+def make_builder(monkeypatch, tmp_path):
+    """
+    Build a RetrieverBuilder whose Chroma collection lives under tmp_path.
+    Returns the builder and the list of texts tokenized while building BM25 indexes.
+    """
+    monkeypatch.setattr(settings, "CHROMA_DB_PATH", str(tmp_path / "chroma"))
+    tokenized = []
+    tokenize = builder_module.default_preprocessing_func
+
+    def counting_tokenize(text):
+        tokenized.append(text)
+        return tokenize(text)
+
+    monkeypatch.setattr(builder_module, "default_preprocessing_func", counting_tokenize)
+    return RetrieverBuilder(), tokenized
+
+
+def make_docs(files):
+    return [
+        Document(page_content=text, metadata={"file_hash": file_hash})
+        for file_hash, texts in files.items()
+        for text in texts
+    ]
+
+
+FILES = {
+    "fruit": ["apples apples apples pears", "apples plums"],
+    "veg": ["apples carrots", "carrots leeks", "leeks onions", "onions peas"],
+}
+
+
+def test_scores_use_global_idf(monkeypatch, tmp_path):
+    rag, _ = make_builder(monkeypatch, tmp_path)
+    docs = make_docs(FILES)
+
+    bm25 = rag._build_bm25(docs, [rag._doc_id(doc) for doc in docs])
+    reference = BM25Retriever.from_documents(docs)
+
+    for query in ["apples", "carrots leeks", "apples onions"]:
+        assert [doc.page_content for doc in bm25.invoke(query)] == [doc.page_content for doc in reference.invoke(query)]
+
+
+def test_rebuild_only_tokenizes_new_files(monkeypatch, tmp_path):
+    rag, tokenized = make_builder(monkeypatch, tmp_path)
+    docs = make_docs(FILES)
+    rag._build_bm25(docs, [rag._doc_id(doc) for doc in docs])
+    tokenized.clear()
+
+    # Same veg file plus a new one; the fruit file is no longer uploaded
+    docs = make_docs({"veg": FILES["veg"], "nuts": ["walnuts pecans"]})
+    bm25 = rag._build_bm25(docs, [rag._doc_id(doc) for doc in docs])
+
+    assert tokenized == ["walnuts pecans"]
+    assert set(rag._bm25_cache) == {"veg", "nuts"}
+    assert [doc.page_content for doc in bm25.docs] == FILES["veg"] + ["walnuts pecans"]
+
+
+def test_changed_file_is_tokenized_again(monkeypatch, tmp_path):
+    rag, tokenized = make_builder(monkeypatch, tmp_path)
+    docs = make_docs(FILES)
+    rag._build_bm25(docs, [rag._doc_id(doc) for doc in docs])
+    tokenized.clear()
+
+    docs = make_docs({"fruit": FILES["fruit"] + ["cherries"], "veg": FILES["veg"]})
+    rag._build_bm25(docs, [rag._doc_id(doc) for doc in docs])
+
+    assert tokenized == FILES["fruit"] + ["cherries"]
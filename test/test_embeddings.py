@@ -0,0 +1,61 @@
+import json
+
+import httpx
+
+from retriever import embeddings as embeddings_module
+from retriever.embeddings import BatchedOllamaEmbeddings
+
+
+### 🔹 Stub Ollama's /api/embed endpoint
+def stub_ollama(monkeypatch):
+    """
+    Route every httpx.AsyncClient created by the embeddings module to an in-memory
+    /api/embed handler. Each text is embedded as [len(text), batch number].
+    Returns the list of received request bodies.
+    """
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/embed"
+        body = json.loads(request.content)
+        requests.append(body)
+        return httpx.Response(200, json={"embeddings": [[float(len(text)), float(len(requests))] for text in body["input"]]})
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(*args, **kwargs):
+        return real_client(*args, transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(embeddings_module.httpx, "AsyncClient", client_factory)
+    return requests
+
+
+def test_embed_documents_batches_and_keeps_order(monkeypatch):
+    requests = stub_ollama(monkeypatch)
+    embedder = BatchedOllamaEmbeddings(model="nomic-embed-text", batch_size=2, timeout=5)
+
+    texts = ["a", "bbb", "cc", "a", "dddd"]
+    vectors = embedder.embed_documents(texts)
+
+    # Duplicates are sent once, in batches of at most batch_size
+    sent = [text for body in requests for text in body["input"]]
+    assert sorted(sent) == sorted(f"{embedder.embed_instruction}{text}" for text in ["a", "bbb", "cc", "dddd"])
+    assert [len(body["input"]) for body in requests] == [2, 2]
+    assert all(body["model"] == "nomic-embed-text" for body in requests)
+
+    # Vectors come back in input order, duplicates included
+    prefix = len(embedder.embed_instruction)
+    assert [vector[0] for vector in vectors] == [float(prefix + len(text)) for text in texts]
+    assert vectors[0] == vectors[3]
+
+
+def test_embed_query_is_cached(monkeypatch):
+    requests = stub_ollama(monkeypatch)
+    embedder = BatchedOllamaEmbeddings(model="nomic-embed-text")
+
+    first = embedder.embed_query("What is the capital of Bui Division?")
+    second = embedder.embed_query("What is the capital of Bui Division?")
+
+    assert first == second
+    assert len(requests) == 1
+    assert requests[0]["input"] == [f"{embedder.query_instruction}What is the capital of Bui Division?"]
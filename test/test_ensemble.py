@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import List
+
+from langchain.retrievers import EnsembleRetriever
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from retriever.ensemble import ConcurrentEnsembleRetriever
+
+
+### 🔹 Fake sub-retriever that waits at a shared barrier before answering
+class BarrierRetriever(BaseRetriever):
+    """
+    Returns fixed documents, but only after every sub-retriever of the ensemble has
+    reached the barrier, which can only happen if they run at the same time.
+    """
+    texts: List[str]
+    barrier: threading.Barrier
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        self.barrier.wait()
+        return [Document(page_content=text) for text in self.texts]
+
+
+### 🔹 Fake sub-retriever that simulates a slow search
+class SlowRetriever(BaseRetriever):
+    texts: List[str]
+    delay: float
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.delay)
+        return [Document(page_content=text) for text in self.texts]
+
+
+def test_sub_retrievers_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    ensemble = ConcurrentEnsembleRetriever(
+        retrievers=[
+            BarrierRetriever(texts=["bm25 hit"], barrier=barrier),
+            BarrierRetriever(texts=["vector hit"], barrier=barrier),
+        ],
+        weights=[0.5, 0.5],
+    )
+
+    # A sequential ensemble would break the barrier on the first retriever
+    docs = ensemble.invoke("capital of Bui Division")
+    assert {doc.page_content for doc in docs} == {"bm25 hit", "vector hit"}
+
+
+def test_latency_is_max_not_sum():
+    ensemble = ConcurrentEnsembleRetriever(
+        retrievers=[
+            SlowRetriever(texts=["a"], delay=0.5),
+            SlowRetriever(texts=["b"], delay=0.5),
+        ],
+        weights=[0.5, 0.5],
+    )
+
+    start = time.perf_counter()
+    ensemble.invoke("query")
+    assert time.perf_counter() - start < 0.9
+
+
+def test_fused_order_matches_ensemble_retriever():
+    retrievers = [
+        SlowRetriever(texts=["a", "b", "c", "d"], delay=0),
+        SlowRetriever(texts=["c", "e", "a", "f"], delay=0),
+    ]
+    weights = [0.4, 0.6]
+
+    expected = EnsembleRetriever(retrievers=retrievers, weights=weights).invoke("query")
+    actual = ConcurrentEnsembleRetriever(retrievers=retrievers, weights=weights).invoke("query")
+
+    assert [doc.page_content for doc in actual] == [doc.page_content for doc in expected]
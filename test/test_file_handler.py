@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain.schema import Document
+
+pytest.importorskip("docling")
+
+from config.settings import settings
+from document_processor import file_handler
+from document_processor.file_handler import DocumentProcessor
+
+
+### 🔹 Replace Docling with a line splitter
+def stub_conversion(monkeypatch, tmp_path):
+    """
+    Point the chunk cache at tmp_path and turn every line of an uploaded file into
+    one chunk instead of running Docling. Returns the list of converted file names.
+    """
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    converted = []
+
+    def process_file(self, name, file_bytes):
+        converted.append(name)
+        chunks = [Document(page_content=line) for line in file_bytes.decode().splitlines()]
+        for chunk in chunks:
+            chunk.metadata["sha256"] = self._generate_hash(chunk.page_content.encode())
+        return chunks
+
+    monkeypatch.setattr(DocumentProcessor, "_process_file", process_file)
+    return converted
+
+
+### 🔹 Process pool that runs its tasks on threads, so the stubbed conversion is used
+class ThreadPool(ThreadPoolExecutor):
+    created = 0
+
+    def __init__(self, max_workers=None, mp_context=None):
+        ThreadPool.created += 1
+        super().__init__(max_workers=max_workers)
+
+
+def upload(name, text):
+    data = text.encode()
+    return (name, data, len(data))
+
+
+def test_chunks_are_deduplicated_in_upload_order(monkeypatch, tmp_path):
+    stub_conversion(monkeypatch, tmp_path)
+    monkeypatch.setattr(file_handler, "ProcessPoolExecutor", ThreadPool)
+    processor = DocumentProcessor()
+
+    chunks = processor.process([upload("a.md", "alpha\nshared"), upload("b.md", "shared\nbeta")])
+
+    assert [chunk.page_content for chunk in chunks] == ["alpha", "shared", "beta"]
+    assert chunks[0].metadata["file_hash"] == chunks[1].metadata["file_hash"] != chunks[2].metadata["file_hash"]
+
+
+def test_cache_hits_skip_conversion_and_the_pool(monkeypatch, tmp_path):
+    converted = stub_conversion(monkeypatch, tmp_path)
+    monkeypatch.setattr(file_handler, "ProcessPoolExecutor", ThreadPool)
+    processor = DocumentProcessor()
+    files = [upload("a.md", "alpha"), upload("b.md", "beta")]
+
+    first = processor.process(files)
+    ThreadPool.created = 0
+    second = processor.process(files)
+
+    assert converted == ["a.md", "b.md"]
+    assert ThreadPool.created == 0
+    assert [chunk.page_content for chunk in second] == [chunk.page_content for chunk in first]
+
+
+def test_single_miss_is_converted_without_a_pool(monkeypatch, tmp_path):
+    converted = stub_conversion(monkeypatch, tmp_path)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a single uncached file must not start a process pool")
+
+    monkeypatch.setattr(file_handler, "ProcessPoolExecutor", no_pool)
+
+    chunks = DocumentProcessor().process([upload("a.md", "alpha"), upload("notes.csv", "skipped")])
+
+    assert converted == ["a.md"]
+    assert [chunk.page_content for chunk in chunks] == ["alpha"]
+
+
+def test_unreadable_cache_entry_skips_only_that_file(monkeypatch, tmp_path):
+    stub_conversion(monkeypatch, tmp_path)
+    processor = DocumentProcessor()
+    bad, good = upload("bad.md", "broken"), upload("good.md", "fine")
+
+    # Corrupt row for the first file: its lookup raises while unpickling
+    processor.db.execute(
+        "INSERT INTO chunks(hash, ts, blob) VALUES (?, strftime('%s', 'now'), ?)",
+        (file_handler.hash_bytes(bad[1]), b"not a pickle")
+    )
+
+    chunks = processor.process([bad, good])
+
+    assert [chunk.page_content for chunk in chunks] == ["fine"]
+
+
+def test_total_size_limit(monkeypatch, tmp_path):
+    stub_conversion(monkeypatch, tmp_path)
+
+    with pytest.raises(ValueError):
+        DocumentProcessor().process([("big.pdf", b"", settings.MAX_TOTAL_SIZE + 1)])
+
+
+def test_sqlite_cache_round_trip(monkeypatch, tmp_path):
+    stub_conversion(monkeypatch, tmp_path)
+    chunks = [
+        Document(page_content="alpha", metadata={"Header 1": "Intro", "sha256": "a"}),
+        Document(page_content="beta", metadata={"sha256": "b"}),
+    ]
+
+    DocumentProcessor()._save_to_cache(chunks, "file-1")
+
+    # A new processor (e.g. a worker process) reads the same database
+    loaded = DocumentProcessor()._load_from_cache("file-1")
+    assert [(doc.page_content, doc.metadata) for doc in loaded] == [(doc.page_content, doc.metadata) for doc in chunks]
+    assert DocumentProcessor()._load_from_cache("missing") is None
+    assert (tmp_path / "chunks.db").exists()
+
+
+def test_sqlite_cache_replaces_and_expires(monkeypatch, tmp_path):
+    stub_conversion(monkeypatch, tmp_path)
+    processor = DocumentProcessor()
+
+    processor._save_to_cache([Document(page_content="old")], "file-1")
+    processor._save_to_cache([Document(page_content="new")], "file-1")
+    assert [doc.page_content for doc in processor._load_from_cache("file-1")] == ["new"]
+
+    # Age the entry past CACHE_EXPIRE_DAYS
+    processor.db.execute("UPDATE chunks SET ts = ts - ? WHERE hash = ?", ((settings.CACHE_EXPIRE_DAYS + 1) * 86400, "file-1"))
+    assert processor._load_from_cache("file-1") is None
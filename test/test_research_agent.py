@@ -0,0 +1,71 @@
+from langchain.schema import Document
+
+from agents.research_agent import ResearchAgent
+from config.settings import settings
+
+
+### 🔹 Stub the model server behind ResearchAgent
+def stub_agent(monkeypatch, tmp_path, temperature=0.0):
+    """
+    Build a ResearchAgent that caches under tmp_path and answers every prompt
+    with "answer <n>", n counting model calls. Returns the agent and the list of
+    prompts sent to the model.
+    """
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "RESEARCH_TEMPERATURE", temperature)
+    agent = ResearchAgent()
+    sent = []
+
+    async def chat_batch(prompts):
+        sent.extend(prompts)
+        return [f"answer {len(sent) - len(prompts) + i + 1}" for i in range(len(prompts))]
+
+    monkeypatch.setattr(agent, "_chat_batch", chat_batch)
+    return agent, sent
+
+
+DOCS = [Document(page_content="Bui Division is found in the NorthWest of Cameroon. And Its capital is Nkuv.")]
+QUESTION = "What is the capital of Bui Division?"
+
+
+def test_cached_answer_is_reused(monkeypatch, tmp_path):
+    agent, sent = stub_agent(monkeypatch, tmp_path)
+
+    first = agent.generate(QUESTION, DOCS)
+    second = agent.generate(QUESTION, DOCS)
+
+    assert len(sent) == 1
+    assert first == second
+    assert first["draft_answer"] == "answer 1"
+    assert len(list((tmp_path / "llm_cache").glob("*.json"))) == 1
+
+
+def test_use_cache_false_bypasses_and_refreshes_cache(monkeypatch, tmp_path):
+    agent, sent = stub_agent(monkeypatch, tmp_path)
+
+    agent.generate(QUESTION, DOCS)
+    retried = agent.generate(QUESTION, DOCS, use_cache=False)
+
+    # The re-research answer comes from the model and replaces the cached one
+    assert len(sent) == 2
+    assert retried["draft_answer"] == "answer 2"
+    assert agent.generate(QUESTION, DOCS)["draft_answer"] == "answer 2"
+
+
+def test_duplicate_prompts_in_a_batch_are_sent_once(monkeypatch, tmp_path):
+    agent, sent = stub_agent(monkeypatch, tmp_path)
+
+    results = agent.generate_batch([(QUESTION, DOCS), ("Where is Bui Division?", DOCS), (QUESTION, DOCS)])
+
+    assert len(sent) == 2
+    assert [result["draft_answer"] for result in results] == ["answer 1", "answer 2", "answer 1"]
+
+
+def test_no_caching_when_sampling(monkeypatch, tmp_path):
+    agent, sent = stub_agent(monkeypatch, tmp_path, temperature=0.7)
+
+    agent.generate(QUESTION, DOCS)
+    agent.generate(QUESTION, DOCS)
+
+    assert len(sent) == 2
+    assert not list((tmp_path / "llm_cache").glob("*.json"))
@@ -0,0 +1,53 @@
+from langchain.schema import Document
+
+from agents.workflow import AgentWorkflow
+from config.settings import settings
+
+
+### 🔹 Workflow whose agents are stubbed: relevant, rejected once, then accepted
+class DocsRetriever:
+    def invoke(self, question):
+        return [Document(page_content="Bui Division is found in the NorthWest of Cameroon. And Its capital is Nkuv.")]
+
+
+def stub_workflow(monkeypatch, tmp_path):
+    """
+    Build an AgentWorkflow with a deterministic research model (temperature 0, so answers are cached)
+    that streams "draft <n>" on its n-th call, and a verifier that rejects the first draft only.
+    """
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "RESEARCH_TEMPERATURE", 0.0)
+    workflow = AgentWorkflow()
+    calls = []
+
+    def chat_stream(prompt):
+        calls.append(prompt)
+        yield "draft "
+        yield str(len(calls))
+
+    def verify(answer, documents):
+        supported = "NO" if answer == "draft 1" else "YES"
+        return {"verification_report": f"Supported: {supported}\nRelevant: YES"}
+
+    monkeypatch.setattr(workflow.researcher, "_chat_stream", chat_stream)
+    monkeypatch.setattr(workflow.verifier, "check", verify)
+    monkeypatch.setattr(workflow.relevance_checker, "check", lambda question, retriever, k=3: "CAN_ANSWER")
+    return workflow, calls
+
+
+def test_re_research_streams_a_fresh_draft(monkeypatch, tmp_path):
+    workflow, calls = stub_workflow(monkeypatch, tmp_path)
+    events = []
+
+    result = workflow.full_pipeline(
+        question="What is the capital of Bui Division?",
+        retriever=DocsRetriever(),
+        on_token=lambda token: events.append(token),
+        on_draft_start=lambda: events.append("<reset>")
+    )
+
+    # The rejected draft is not served again from the response cache
+    assert len(calls) == 2
+    assert events == ["<reset>", "draft ", "1", "<reset>", "draft ", "2"]
+    assert result["draft_answer"] == "draft 2"
+    assert "Supported: YES" in result["verification_report"]
@@ -0,0 +1,10 @@
+from blake3 import blake3
+
+
+#Purpose: Hash a bytes-like object for deduplication and cache keys.
+#How it works: BLAKE3 is used instead of SHA-256 since these hashes only need collision resistance, not a specific
+#cryptographic standard. It reads the buffer in place (no copy), uses SIMD and, with max_threads=AUTO, hashes large
+#uploads across all cores.
+def hash_bytes(data) -> str:
+    """Generate a BLAKE3 hex digest of a bytes-like object."""
+    return blake3(data, max_threads=blake3.AUTO).hexdigest()